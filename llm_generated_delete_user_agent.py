@@ -1,5 +1,6 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel, constr
+from pydantic import BaseModel, constr, field_validator
 from comms_api.authentication.authentication import JWTBearer
 
 router = APIRouter(prefix="/api/v1", tags=["users"])
@@ -8,6 +9,26 @@ class DeleteUserAgentsRequest(BaseModel):
     """Request model for deleting user agents."""
     user_agent_ids: list[constr(min_length=1)]  # List of user agent IDs to delete
 
+    @field_validator("user_agent_ids")
+    @classmethod
+    def deduplicate_user_agent_ids(cls, user_agent_ids: list[str]) -> list[str]:
+        """Remove duplicate IDs, keeping their order, and require at least one ID."""
+        if not user_agent_ids:
+            raise ValueError("At least one user agent ID is required.")
+        return list(dict.fromkeys(user_agent_ids))
+
+async def delete_user_agent(agent_id: str) -> None:
+    """
+    Delete a single user agent from all devices.
+
+    Parameters
+    ----------
+    agent_id : str
+        The ID of the user agent to delete.
+    """
+    # Logic for deleting the user agent (pseudo code)
+    pass  # Replace with actual deletion logic
+
 @router.delete("/user_agents", response_model=dict)
 async def delete_user_agents(request_body: DeleteUserAgentsRequest, token: str = Depends(JWTBearer())):
     """
@@ -23,24 +44,22 @@ async def delete_user_agents(request_body: DeleteUserAgentsRequest, token: str =
     Raises
     ------
     HTTPException
-        If the user agent IDs are invalid or if the operation fails.
+        If the user agent IDs are invalid or if deleting any of them fails.
 
     Returns
     -------
     dict
         A success message indicating deletion of user agents.
     """
-    try:
-        # Simulate the deletion process
-        user_agent_ids = request_body.user_agent_ids
-
-        for agent_id in user_agent_ids:
-            # Logic for deleting the user agent (pseudo code)
-            # delete_user_agent(agent_id)
-
-            pass  # Replace with actual deletion logic
+    # Delete all user agents concurrently and collect the failures instead of stopping at the first one
+    user_agent_ids = request_body.user_agent_ids
+    results = await asyncio.gather(
+        *(delete_user_agent(agent_id) for agent_id in user_agent_ids),
+        return_exceptions=True
+    )
 
-        return {"message": "User agents deleted successfully."}
+    failed = [agent_id for agent_id, result in zip(user_agent_ids, results) if isinstance(result, Exception)]
+    if failed:
+        raise HTTPException(status_code=500, detail={"message": "Failed to delete user agents.", "failed": failed})
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Failed to delete user agents: {str(e)}")
+    return {"message": "User agents deleted successfully."}
@@ -1,47 +1,91 @@
 #!/usr/bin/env python3
 import argparse
+import asyncio
 import colorlog
+import functools
+import hashlib
+import json
 import logging
 import os
-from flask import Flask, send_file
-from flask_swagger_ui import get_swaggerui_blueprint
-from openai import OpenAI
+import sqlite3
+import string
+import tiktoken
+import uvicorn
+import yaml
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import TextIO
+from fastapi import FastAPI, Request
+from fastapi.openapi.docs import get_swagger_ui_html
+from fastapi.responses import HTMLResponse, Response
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
 load_dotenv()
-app = Flask(__name__)
+# FastAPI's own documentation of the catalogue server is disabled, only the generated one is served
+app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
 
 # Endpoints for the API catalogue
 SWAGGER_URL = "/swagger"
 SWAGGER_FILE_FILEPATH = "api_documentation_swagger.yaml"
 API_URL = f"/static/{SWAGGER_FILE_FILEPATH}"
 
-# Endpoint configuration
-swagger_ui_blueprint = get_swaggerui_blueprint(SWAGGER_URL, API_URL)
-app.register_blueprint(swagger_ui_blueprint, url_prefix=SWAGGER_URL)
+# The documentation only changes when it is regenerated, so it is served from memory until its mtime changes
+swagger_file_cache = {"mtime": None, "content": b"", "etag": ""}
 
 # Load the OpenAI API key and initialize the client
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 MODEL_NAME: str = "gpt-4o-mini"
 
+# Documentation is generated in batches of files to avoid overflowing the context window. The per-file YAML
+# limit of 4,000 characters in PROMPT_GENERATE_DOCUMENTATION is chosen so that the JSON-escaped output of a full
+# batch (~32,000 characters, ~11,000 tokens) fits in RESPONSE_MAX_TOKENS, the output limit of gpt-4o-mini.
+DOCUMENTATION_BATCH_SIZE: int = 8
+CONTEXT_WINDOW_TOKENS: int = 128_000
+RESPONSE_MAX_TOKENS: int = 16_000
+MAX_PROMPT_TOKENS: int = CONTEXT_WINDOW_TOKENS - RESPONSE_MAX_TOKENS
+MAX_CONCURRENT_REQUESTS: int = 5
+
+# The OpenAI Batch API is polled until the batch reaches one of the terminal statuses
+BATCH_POLL_INTERVAL_SECONDS: int = 30
+BATCH_TERMINAL_STATUSES: tuple = ("completed", "failed", "expired", "cancelled")
+
+# Directories that never contain the project's own source code are not traversed
+IGNORE_DIRS: frozenset = frozenset({
+    ".git", "node_modules", ".venv", "venv", "__pycache__", "dist", "build", ".mypy_cache", ".pytest_cache", ".tox"
+})
+
+# Number of threads used to walk the project's top-level directories
+MAX_SCAN_WORKERS: int = 16
+
+# Only the beginning of very large (e.g. generated) files is sent to the LLM
+MAX_FILE_BYTES: int = 64 * 1024
+
+# Responses are cached on disk so re-runs on an unchanged project do not hit the API
+RESPONSE_CACHE_FILEPATH: str = ".response_cache.sqlite3"
+
+# The code for the new endpoint is streamed into this file as it is generated
+NEW_ENDPOINT_FILEPATH: str = "llm_generated_endpoint.py"
+
 # Prompts
+# The static instructions come first and the variable inputs last, so that the prompt prefix is identical
+# between requests and can be reused by OpenAI's automatic prompt caching.
 PROMPT_IDENTIFY_API = """
 You are an expert in analyzing software project structures. Given a list of file paths, identify which directory (or directories) is most likely the API directory. API directories often contain files related to request handling, such as routes/, controllers/, api/, or endpoints/. Consider naming conventions and directory structures used in common web frameworks (Node.js, Django, Flask, etc.).
 
-Here is the list of file paths:
-
-<PATHS>
-
 Only return the file paths with the APIs, each path on their own line, like so:
     path 1
     path 2
     path n
 
 Do not add any other explanation or other response text. Only include the .py python files. Ignore all __init__.py files and other not-source-code related files.
+
+Here is the list of file paths:
+$PATHS
 """
 
 PROMPT_GENERATE_DOCUMENTATION = """
-You are an AI-powered documentation generator. Your task is to generate a Swagger (OpenAPI 3.0.0) YAML specification based on a given dictionary of file paths and their contents.
+You are an AI-powered documentation generator. Your task is to generate Swagger (OpenAPI 3.0.0) YAML specifications based on a given JSON list of files and their contents.
 Requirements:
 
     - Extract API details from the given file contents, including:
@@ -52,21 +96,30 @@ Requirements:
         - Responses: Define expected response codes (200, 400, 500, etc.) and their descriptions.
         - Request/Response Examples: If available, include JSON examples for clarity.
     - Ensure the documentation follows Swagger best practices and is structured properly.
-    - Keep the YAML output under 10,000 characters.
+    - Keep the YAML output of each file under 4,000 characters.
 
 Instructions:
 
-    - Parse the given dictionary, where:
-        - Keys represent file paths.
-        - Values contain the code and comments that define API endpoints.
-    - Extract relevant API details and organize them in Swagger-compliant YAML format.
-    - Do not include any text that is not part of the YAML documentation.
+    - Parse the given JSON list, where each element has:
+        - "path": the file path.
+        - "content": the code and comments that define API endpoints.
+    - Extract relevant API details of each file and organize them in Swagger-compliant YAML format.
+    - Each YAML document must only contain the top-level "paths" and "components" keys.
     - Ensure proper indentation and formatting to maintain readability.
 
-Do not include any backticks or other markdown formatting, the user is expecting the entire file to be in valid yaml syntax.
+Return only a JSON list with one element per given file, like so:
+    [{"path": "path 1", "yaml": "paths: ..."}, {"path": "path 2", "yaml": "paths: ..."}]
+
+Do not include any backticks or other markdown formatting, the user is expecting the entire response to be valid JSON.
+
+Example input:
+    [{"path": "app/api/users.py", "content": "@app.route('/users/<int:user_id>', methods=['GET'])\\ndef get_user(user_id):\\n    \\"\\"\\"Return a single user.\\"\\"\\"\\n    user = User.query.get(user_id)\\n    if user is None:\\n        abort(404)\\n    return jsonify(user.to_dict())"}]
+
+Example output:
+    [{"path": "app/api/users.py", "yaml": "paths:\\n  /users/{user_id}:\\n    get:\\n      summary: Get user\\n      description: Return a single user.\\n      parameters:\\n        - name: user_id\\n          in: path\\n          required: true\\n          schema:\\n            type: integer\\n      responses:\\n        '200':\\n          description: The user.\\n        '404':\\n          description: User not found.\\n"}]
 
 Here are the file contents:
-<FILE CONTENTS>
+$FILE_CONTENTS
 """
 
 PROMPT_GENERATE_NEW_ENDPOINT = """
@@ -88,62 +141,548 @@ You are an AI assistant specializing in generating API endpoints for web applica
 - Only return the generated Python code, without additional explanation.
 
 **Inputs:**
-- Project structure: <PATHS>
-- Functionality description: <DESCRIPTION>
-- Project file contents: <FILE CONTENTS>
+- Project structure:
+$PATHS
+- Project file contents: $FILE_CONTENTS
+- Functionality description: $DESCRIPTION
 """
 
+# Templates are compiled once at import instead of on every substitution
+PROMPT_IDENTIFY_API_TMPL = string.Template(PROMPT_IDENTIFY_API)
+PROMPT_GENERATE_DOCUMENTATION_TMPL = string.Template(PROMPT_GENERATE_DOCUMENTATION)
+PROMPT_GENERATE_NEW_ENDPOINT_TMPL = string.Template(PROMPT_GENERATE_NEW_ENDPOINT)
+
 # Logging configuration
-log_formatter = colorlog.ColoredFormatter(
-    '%(asctime)s - %(log_color)s%(levelname)-8s%(reset)s - %(funcName)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S',
-    log_colors={
-        'DEBUG': 'cyan',
-        'INFO': 'green',
-        'WARNING': 'yellow',
-        'ERROR': 'red',
-        'CRITICAL': 'bold_red',
-    }
-)
+logger = logging.getLogger()
 
-console_handler = logging.StreamHandler()
-console_handler.setFormatter(log_formatter)
 
-logger = logging.getLogger()
-logger.addHandler(console_handler)
-logger.setLevel(logging.INFO)
+@functools.lru_cache(maxsize=1)
+def setup_logging() -> None:
+    """
+    Configures the colored console logging. Only the first call has any effect.
+
+    Returns:
+        None
+    """
+    # Handlers may already be attached if the module has been imported again, e.g. by a reloader
+    if logger.handlers:
+        return
+
+    log_formatter = colorlog.ColoredFormatter(
+        '%(asctime)s - %(log_color)s%(levelname)-8s%(reset)s - %(funcName)s - %(message)s',
+        datefmt='%Y-%m-%d %H:%M:%S',
+        log_colors={
+            'DEBUG': 'cyan',
+            'INFO': 'green',
+            'WARNING': 'yellow',
+            'ERROR': 'red',
+            'CRITICAL': 'bold_red',
+        }
+    )
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(log_formatter)
+
+    logger.addHandler(console_handler)
+    logger.setLevel(logging.INFO)
+
+
+def get_cache_key(prompt: str, max_len: int) -> str:
+    """
+    Computes the response cache key for a request.
+
+    Args:
+        prompt (str): The prompt sent to the model.
+        max_len (int): The maximum length for a response (max tokens).
+
+    Returns:
+        str: SHA-256 hex digest of the model name, max length and prompt.
+    """
+    return hashlib.sha256(f"{MODEL_NAME}|{max_len}|{prompt}".encode()).hexdigest()
+
+
+@functools.lru_cache(maxsize=1)
+def open_response_cache() -> sqlite3.Connection:
+    """
+    Opens the response cache database, creating its table if needed. The connection is shared by all calls.
+
+    Returns:
+        sqlite3.Connection: The connection to the response cache.
+    """
+    connection = sqlite3.connect(RESPONSE_CACHE_FILEPATH)
+    with connection:
+        connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, response TEXT NOT NULL)")
+    return connection
+
+
+def get_cached_response(key: str) -> str | None:
+    """
+    Fetches a previously generated response from the response cache.
+
+    Args:
+        key (str): The cache key of the request.
+
+    Returns:
+        The cached response, or None if the request has not been cached.
+    """
+    row = open_response_cache().execute("SELECT response FROM cache WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def store_cached_response(key: str, response: str) -> None:
+    """
+    Stores a generated response in the response cache.
+
+    Args:
+        key (str): The cache key of the request.
+        response (str): The model's generated response.
+
+    Returns:
+        None
+    """
+    connection = open_response_cache()
+    with connection:
+        connection.execute("INSERT OR REPLACE INTO cache (key, response) VALUES (?, ?)", (key, response))
 
 
-def generate_response(prompt: str, max_len: int) -> str:
+async def generate_response(prompt: str, max_len: int, use_cache: bool = True, output: TextIO | None = None) -> tuple:
     """
     Generates a response based on the prompt using OpenAI's ChatGPT API.
 
+    The response is streamed, so that it can be written to the output as soon as the first tokens arrive.
+
     Args:
         prompt (str): The prompt to generate a response for.
         max_len (int): The maximum length for a response (max tokens).
+        use_cache (bool): Whether to return a previously cached response. Complete responses are always cached.
+        output (TextIO | None): Optional file to write the response to while it is being generated.
 
     Returns:
-        str: The model's generated response.
+        Tuple of the model's generated response (str) and the reason the generation finished (str | None),
+        e.g. "stop" for a complete response or "length" when it was cut off at max_len.
     """
+    cache_key = get_cache_key(prompt, max_len)
+    if use_cache:
+        cached_response = get_cached_response(cache_key)
+        if cached_response is not None:
+            logger.info("Using cached response for prompt")
+            if output is not None:
+                output.write(cached_response)
+                output.flush()
+            # Only complete responses are cached
+            return cached_response, "stop"
+
     logger.info(f"Generating response for prompt: {prompt}")
 
     try:
         # Make API call to OpenAI's ChatGPT API
-        response = client.chat.completions.create(model=MODEL_NAME,
+        stream = await client.chat.completions.create(model=MODEL_NAME,
         messages=[{"role": "user", "content": prompt}],
-        max_tokens=max_len)
-
-        # Extract and return the generated text from the response
-        response_text = response.choices[0].message.content
-        return response_text
+        max_tokens=max_len,
+        stream=True)
+
+        # Collect the generated text from the streamed chunks
+        response_parts = []
+        finish_reason = None
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            finish_reason = chunk.choices[0].finish_reason or finish_reason
+            text = chunk.choices[0].delta.content or ""
+            response_parts.append(text)
+            if output is not None:
+                output.write(text)
+                output.flush()
+        response_text = "".join(response_parts)
     except Exception as e:
         logger.error(f"Error occurred while generating response: {e}")
         raise
 
+    # Responses cut off at max_len are not cached, so that the next run tries again
+    if finish_reason == "stop":
+        store_cached_response(cache_key, response_text)
+    return response_text, finish_reason
+
+
+@functools.lru_cache(maxsize=1)
+def get_encoding() -> tiktoken.Encoding:
+    """
+    Loads the tokenizer of the used model.
+
+    Returns:
+        tiktoken.Encoding: The model's tokenizer.
+    """
+    return tiktoken.encoding_for_model(MODEL_NAME)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Counts the number of tokens the text takes in a prompt.
+
+    Args:
+        text (str): The text to count the tokens of.
+
+    Returns:
+        int: The number of tokens.
+    """
+    return len(get_encoding().encode(text, disallowed_special=()))
+
+
+def chunk_file_contents(file_contents: dict, chunk_size: int, max_tokens: int) -> list:
+    """
+    Packs the file contents into chunks of whole files to be sent in a single request.
+
+    Args:
+        file_contents (dict): Filepaths mapped to their contents.
+        chunk_size (int): The maximum number of files per chunk.
+        max_tokens (int): The maximum number of tokens per chunk.
+
+    Returns:
+        List of chunks, each a list of {"path": ..., "content": ...} dictionaries.
+    """
+    chunks = []
+    chunk = []
+    chunk_tokens = 0
+    for path, content in file_contents.items():
+        file = {"path": path, "content": content}
+        file_tokens = count_tokens(json.dumps(file))
+
+        if chunk and (len(chunk) >= chunk_size or chunk_tokens + file_tokens > max_tokens):
+            chunks.append(chunk)
+            chunk = []
+            chunk_tokens = 0
+
+        if file_tokens > max_tokens:
+            logging.warning(f"File {path} alone exceeds the token limit of a request")
+
+        chunk.append(file)
+        chunk_tokens += file_tokens
+
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def build_documentation_prompt(chunk: list) -> str:
+    """
+    Builds the documentation generation prompt for a chunk of files.
+
+    Args:
+        chunk (list): List of {"path": ..., "content": ...} dictionaries.
+
+    Returns:
+        str: The prompt to send to the model.
+    """
+    return PROMPT_GENERATE_DOCUMENTATION_TMPL.substitute(FILE_CONTENTS=json.dumps(chunk))
+
+
+def parse_documentation_response(response: str, chunk: list) -> list:
+    """
+    Parses the documentation fragments generated for a chunk of files.
+
+    Args:
+        response (str): The model's generated response.
+        chunk (list): List of {"path": ..., "content": ...} dictionaries the response was generated for.
+
+    Returns:
+        List of {"path": ..., "yaml": ...} dictionaries, empty if the response could not be parsed.
+    """
+    paths = [file["path"] for file in chunk]
+    try:
+        fragments = json.loads(response)
+    except json.JSONDecodeError as e:
+        logging.error(f"Failed to parse the documentation generated for {paths}: {e}")
+        return []
+
+    if not isinstance(fragments, list):
+        logging.error(f"The documentation generated for {paths} is not a JSON list")
+        return []
+
+    valid_fragments = []
+    for fragment in fragments:
+        if isinstance(fragment, dict) and isinstance(fragment.get("yaml"), str):
+            valid_fragments.append(fragment)
+        else:
+            logging.error(f"Skipping malformed documentation fragment generated for {paths}: {fragment}")
+    return valid_fragments
+
+
+def split_truncated_chunk(chunk: list) -> list:
+    """
+    Splits a chunk whose documentation was cut off at the token limit, so that its halves can be retried.
+
+    Args:
+        chunk (list): List of {"path": ..., "content": ...} dictionaries.
+
+    Returns:
+        List of the two halves of the chunk, empty if the chunk is a single file that cannot be split.
+    """
+    paths = [file["path"] for file in chunk]
+    if len(chunk) == 1:
+        logging.error(f"The documentation generated for {paths} was cut off at {RESPONSE_MAX_TOKENS} tokens")
+        return []
+
+    logging.warning(f"The documentation generated for {paths} was cut off, splitting the chunk")
+    half = len(chunk) // 2
+    return [chunk[:half], chunk[half:]]
+
+
+async def generate_documentation_chunk(chunk: list, semaphore: asyncio.Semaphore, use_cache: bool = True) -> list:
+    """
+    Generates the Swagger documentation fragments for a single chunk of files.
+
+    Args:
+        chunk (list): List of {"path": ..., "content": ...} dictionaries.
+        semaphore (asyncio.Semaphore): Limits the number of concurrent API calls.
+        use_cache (bool): Whether to use previously cached responses.
+
+    Returns:
+        List of {"path": ..., "yaml": ...} dictionaries, empty if the response could not be parsed.
+    """
+    prompt = build_documentation_prompt(chunk)
+    async with semaphore:
+        response, finish_reason = await generate_response(prompt, RESPONSE_MAX_TOKENS, use_cache)
+
+    if finish_reason == "length":
+        # The response was cut off, so document the halves of the chunk separately
+        halves = await asyncio.gather(
+            *[generate_documentation_chunk(half, semaphore, use_cache) for half in split_truncated_chunk(chunk)]
+        )
+        return [fragment for half in halves for fragment in half]
+
+    return parse_documentation_response(response, chunk)
+
+
+def log_batch_request_failure(result: dict) -> None:
+    """
+    Logs a failed request of a batch with the details needed to diagnose it.
+
+    Args:
+        result (dict): A line of the batch's output or error file.
+
+    Returns:
+        None
+    """
+    response = result.get("response") or {}
+    logging.error(
+        f"Batch request {result.get('custom_id')} failed: error={result.get('error')}, "
+        f"status_code={response.get('status_code')}, body={response.get('body')}"
+    )
+
+
+async def generate_documentation_batch(chunks: list, use_cache: bool = True) -> list:
+    """
+    Generates the Swagger documentation fragments for all chunks with the OpenAI Batch API.
+
+    The Batch API costs half of the synchronous API but may take up to 24 hours to complete.
+
+    Args:
+        chunks (list): List of chunks, each a list of {"path": ..., "content": ...} dictionaries.
+        use_cache (bool): Whether to use previously cached responses.
+
+    Returns:
+        List of {"path": ..., "yaml": ...} dictionaries of all chunks.
+    """
+    prompts = [build_documentation_prompt(chunk) for chunk in chunks]
+    responses = {}
+    truncated = set()
+
+    # Only submit the prompts that have not been answered before
+    if use_cache:
+        for i, prompt in enumerate(prompts):
+            cached_response = get_cached_response(get_cache_key(prompt, RESPONSE_MAX_TOKENS))
+            if cached_response is not None:
+                responses[f"chunk-{i}"] = cached_response
+
+    requests = [
+        {
+            "custom_id": f"chunk-{i}",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": MODEL_NAME,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": RESPONSE_MAX_TOKENS,
+            },
+        }
+        for i, prompt in enumerate(prompts) if f"chunk-{i}" not in responses
+    ]
+
+    if requests:
+        batch_file = "\n".join(json.dumps(request) for request in requests).encode()
+        input_file = await client.files.create(file=("documentation_batch.jsonl", batch_file), purpose="batch")
+        batch = await client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        logging.info(f"Submitted batch {batch.id} with {len(requests)} requests")
+
+        while batch.status not in BATCH_TERMINAL_STATUSES:
+            await asyncio.sleep(BATCH_POLL_INTERVAL_SECONDS)
+            batch = await client.batches.retrieve(batch.id)
+            logging.info(f"Batch {batch.id} status: {batch.status}")
+
+        if batch.status != "completed":
+            logging.error(f"Batch {batch.id} did not complete successfully: {batch.status}")
+
+        # Expired and cancelled batches may still have results for some of the requests
+        if batch.output_file_id:
+            output_file = await client.files.content(batch.output_file_id)
+            for line in output_file.text.splitlines():
+                result = json.loads(line)
+                response = result.get("response") or {}
+                if result.get("error") or response.get("status_code") != 200:
+                    log_batch_request_failure(result)
+                    continue
+
+                choice = response["body"]["choices"][0]
+                response_text = choice["message"]["content"]
+                if choice.get("finish_reason") == "length":
+                    truncated.add(result["custom_id"])
+                    continue
+
+                responses[result["custom_id"]] = response_text
+                if choice.get("finish_reason") == "stop":
+                    i = int(result["custom_id"].removeprefix("chunk-"))
+                    store_cached_response(get_cache_key(prompts[i], RESPONSE_MAX_TOKENS), response_text)
+
+        # Requests that failed are not in the output file, only in the error file
+        if batch.error_file_id:
+            error_file = await client.files.content(batch.error_file_id)
+            for line in error_file.text.splitlines():
+                log_batch_request_failure(json.loads(line))
+
+    fragments = []
+    retried_chunks = []
+    for i, chunk in enumerate(chunks):
+        if f"chunk-{i}" in responses:
+            fragments.extend(parse_documentation_response(responses[f"chunk-{i}"], chunk))
+        elif f"chunk-{i}" in truncated:
+            retried_chunks.extend(split_truncated_chunk(chunk))
+        else:
+            retried_chunks.append(chunk)
+
+    # Chunks without a usable batch response are retried with the synchronous API, split if they were cut off
+    if retried_chunks:
+        logging.warning(f"Retrying {len(retried_chunks)} chunks without a usable batch response synchronously")
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        retried_fragments = await asyncio.gather(
+            *[generate_documentation_chunk(chunk, semaphore, use_cache) for chunk in retried_chunks]
+        )
+        for chunk_fragments in retried_fragments:
+            fragments.extend(chunk_fragments)
+    return fragments
+
+
+def merge_documentation_fragments(fragments: list) -> str:
+    """
+    Merges the per-file Swagger fragments into a single OpenAPI document.
+
+    Args:
+        fragments (list): List of {"path": ..., "yaml": ...} dictionaries.
+
+    Returns:
+        str: The merged Swagger documentation in YAML format.
+    """
+    documentation = {
+        "openapi": "3.0.0",
+        "info": {"title": "API documentation", "version": "1.0.0"},
+        "paths": {},
+        "components": {},
+    }
+
+    for fragment in fragments:
+        if not isinstance(fragment.get("yaml"), str):
+            logging.error(f"Documentation generated for {fragment.get('path')} is not a YAML string")
+            continue
+        try:
+            spec = yaml.safe_load(fragment["yaml"]) or {}
+        except yaml.YAMLError as e:
+            logging.error(f"Invalid YAML generated for {fragment.get('path')}: {e}")
+            continue
+
+        if not isinstance(spec, dict):
+            logging.error(f"YAML generated for {fragment.get('path')} is not a Swagger document")
+            continue
+        paths = spec.get("paths") or {}
+        components = spec.get("components") or {}
+        if not isinstance(paths, dict) or not isinstance(components, dict):
+            logging.error(f"YAML generated for {fragment.get('path')} is not a Swagger document")
+            continue
+
+        # Endpoints sharing an URL path across files keep all of their methods
+        for url_path, methods in paths.items():
+            if not isinstance(methods, dict):
+                logging.error(f"Skipping malformed path {url_path} generated for {fragment.get('path')}")
+                continue
+            documentation["paths"].setdefault(url_path, {}).update(methods)
+        for section, items in components.items():
+            if not isinstance(items, dict):
+                logging.error(f"Skipping malformed component {section} generated for {fragment.get('path')}")
+                continue
+            documentation["components"].setdefault(section, {}).update(items)
+
+    if not documentation["components"]:
+        del documentation["components"]
+
+    return yaml.safe_dump(documentation, sort_keys=False, allow_unicode=True)
+
+
+def scan_directory(path: str) -> tuple:
+    """
+    Lists the python files and the subdirectories to traverse of a single directory.
+
+    Args:
+        path (str): The directory to scan.
+
+    Returns:
+        Tuple of the python filepaths and the subdirectory paths.
+    """
+    files = []
+    subdirs = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                if entry.name not in IGNORE_DIRS:
+                    subdirs.append(entry.path)
+            elif entry.name.endswith(".py"):
+                # Only .py files are supported, so prune the rest already here
+                files.append(entry.path)  # Full path of each file
+    return files, subdirs
+
+
+def scan_subtree(path: str) -> list:
+    """
+    Fetches all python filepaths under the given directory. Directories that cannot be read are skipped.
+
+    Args:
+        path (str): The root directory of the subtree.
+
+    Returns:
+        List of filepaths.
+    """
+    paths = []
+    stack = [path]
+    while stack:
+        directory = stack.pop()
+        try:
+            files, subdirs = scan_directory(directory)
+        except OSError as e:
+            # Like os.walk, skip unreadable directories and ones removed during the walk
+            logging.error(f"Failed to scan directory {directory}: {e}")
+            continue
+        paths.extend(files)
+        stack.extend(subdirs)
+    return paths
+
 
 def get_filepaths_from_path(project_path: str) -> list:
     """
-    Fetches all filepaths from the provided project path, if it exists.
+    Fetches all python filepaths from the provided project path, if it exists.
+
+    The top-level subdirectories are scanned in parallel, as the walk is dominated by the
+    file system latency especially on network file systems.
 
     Args:
         project_path (str): The path to the project's root directory.
@@ -153,10 +692,11 @@ def get_filepaths_from_path(project_path: str) -> list:
     """
     try:
         logging.info(f"Fetching filepaths from {project_path}")
-        paths = []
-        for root, dirs, files in os.walk(project_path):
-            for file in files:
-                paths.append(os.path.join(root, file))  # Full path of each file
+        paths, subdirs = scan_directory(project_path)
+        with ThreadPoolExecutor(max_workers=MAX_SCAN_WORKERS) as executor:
+            # map() keeps the order stable between runs, so that the prompts stay cacheable
+            for subtree_paths in executor.map(scan_subtree, subdirs):
+                paths.extend(subtree_paths)
         logging.info(f"Successfully found filepaths")
         return paths
     except FileNotFoundError:
@@ -164,6 +704,59 @@ def get_filepaths_from_path(project_path: str) -> list:
         raise
 
 
+def read_source_file(filepath: str) -> str:
+    """
+    Reads a source file as UTF-8, truncated to MAX_FILE_BYTES.
+
+    Args:
+        filepath (str): The filepath to read.
+
+    Returns:
+        str: The file contents. Invalid UTF-8 sequences are replaced.
+    """
+    with open(filepath, "rb") as file:
+        data = file.read(MAX_FILE_BYTES + 1)
+    if len(data) > MAX_FILE_BYTES:
+        logging.warning(f"File {filepath} is larger than {MAX_FILE_BYTES} bytes, only its beginning is used")
+        data = data[:MAX_FILE_BYTES]
+    return data.decode("utf-8", errors="replace")
+
+
+async def read_file_contents(filepaths: list) -> dict:
+    """
+    Reads the contents of the given python files concurrently.
+
+    Args:
+        filepaths (list): The filepaths to read.
+
+    Returns:
+        dict: Filepaths mapped to their contents. Files that could not be read are left out.
+    """
+    py_paths = []
+    for filepath in filepaths:
+        # Only consider .py files
+        if filepath.endswith(".py"):
+            py_paths.append(filepath)
+        else:
+            logging.error(f"Attempted to parse a non-python file: {filepath}")
+
+    contents = await asyncio.gather(
+        *[asyncio.to_thread(read_source_file, filepath) for filepath in py_paths],
+        return_exceptions=True
+    )
+
+    file_contents = {}
+    for filepath, content in zip(py_paths, contents):
+        if isinstance(content, FileNotFoundError):
+            # AI hallucinated and failed to identify some filepath
+            logging.error(f"Filepath {filepath} does not exist!")
+        elif isinstance(content, Exception):
+            logging.error(f"Exception occurred while reading {filepath}: {content}")
+        else:
+            file_contents[filepath] = content
+    return file_contents
+
+
 def initialize_argparse() -> argparse.ArgumentParser:
     """
     Initializes and returns the argument parser for the CLI tool.
@@ -182,16 +775,32 @@ def initialize_argparse() -> argparse.ArgumentParser:
         help="Path to the local project."
     )
 
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Ignore previously cached LLM responses. The new responses replace them in the cache."
+    )
+
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Generate the documentation with the OpenAI Batch API. Cheaper, but may take up to 24 hours."
+    )
+
     return parser
 
 
-def main() -> None:
+async def main() -> None:
     """
     Main function of the application for the assignment SS-B.
 
+    The API identification must finish first, after which the documentation and the new endpoint
+    are generated concurrently as they do not depend on each other.
+
     Returns:
         None
     """
+    setup_logging()
     parser = initialize_argparse()
     args = parser.parse_args()
 
@@ -199,30 +808,57 @@ def main() -> None:
     filepaths = get_filepaths_from_path(args.project_path)
 
     # Ask AI to identify the directories with API endpoints
-    prompt = PROMPT_IDENTIFY_API.replace("<PATHS>", str(filepaths))
-    identified_api_endpoints = generate_response(prompt, 1000).split("\n")
+    prompt = PROMPT_IDENTIFY_API_TMPL.substitute(PATHS="\n".join(filepaths))
+    use_cache = not args.no_cache
+    identified_api_endpoints_response, finish_reason = await generate_response(prompt, 1000, use_cache)
+    if finish_reason == "length":
+        logging.warning("The list of identified API files was cut off, some files may be missing")
+    identified_api_endpoints = identified_api_endpoints_response.split("\n")
 
     # Fetch file contents using the LLM provided filepaths
-    file_contents = {}
-    for filepath in identified_api_endpoints:
-        try:
-            # Only consider .py files
-            if filepath.endswith(".py"):
-                f = open(filepath, "r")
-                file_contents[filepath] = f.read()
-            else:
-                logging.error(f"Attempted to parse a non-python file: {filepath}")
-        except FileNotFoundError:
-            # AI hallucinated and failed to identify some filepath
-            logging.error(f"Filepath {filepath} does not exist!")
-            continue
-        except Exception as e:
-            logging.error(f"Exception occurred while reading {filepath}: {e}")
-            continue
+    file_contents = await read_file_contents(identified_api_endpoints)
+
+    # Document the files in batches as analyzing all of them at once overwhelms the API
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+    documentation_chunks = chunk_file_contents(
+        file_contents,
+        DOCUMENTATION_BATCH_SIZE,
+        MAX_PROMPT_TOKENS - count_tokens(PROMPT_GENERATE_DOCUMENTATION)
+    )
+    if args.batch:
+        documentation_tasks = [generate_documentation_batch(documentation_chunks, use_cache)]
+    else:
+        documentation_tasks = [
+            generate_documentation_chunk(chunk, semaphore, use_cache) for chunk in documentation_chunks
+        ]
+
+    # Generate new endpoint based on user's request
+    new_endpoint_description = "I want to create a new endpoint which deletes user agents from all devices"
+    new_endpoint_paths = "\n".join(filepaths)
+
+    # Only consider the files that fit in a single request, otherwise the OpenAPI token limit may be reached
+    new_endpoint_max_tokens = MAX_PROMPT_TOKENS - count_tokens(
+        PROMPT_GENERATE_NEW_ENDPOINT + new_endpoint_paths + new_endpoint_description
+    )
+    new_endpoint_chunks = chunk_file_contents(file_contents, len(file_contents), new_endpoint_max_tokens)
 
-    # Take only the first n files as analyzing all of them at once overwhelms the API
-    prompt = PROMPT_GENERATE_DOCUMENTATION.replace("<FILE CONTENTS>", str(file_contents))
-    generated_api_documentation = generate_response(prompt, 10000)
+    new_endpoint_prompt = PROMPT_GENERATE_NEW_ENDPOINT_TMPL.substitute(
+        PATHS=new_endpoint_paths,
+        FILE_CONTENTS=json.dumps(new_endpoint_chunks[0] if new_endpoint_chunks else []),
+        DESCRIPTION=new_endpoint_description
+    )
+
+    # The requests are independent, so fire them in parallel
+    with open(NEW_ENDPOINT_FILEPATH, "w") as new_endpoint_file:
+        (_, new_endpoint_finish_reason), *documentation_responses = await asyncio.gather(
+            generate_response(new_endpoint_prompt, RESPONSE_MAX_TOKENS, use_cache, new_endpoint_file),
+            *documentation_tasks,
+        )
+    if new_endpoint_finish_reason == "length":
+        logging.warning(f"The code for the new endpoint was cut off at {RESPONSE_MAX_TOKENS} tokens")
+    generated_api_documentation = merge_documentation_fragments(
+        [fragment for response in documentation_responses for fragment in response]
+    )
     logging.info(generated_api_documentation)
 
     # Save the response as a file
@@ -230,28 +866,43 @@ def main() -> None:
     with open(filename, "w") as file:
         file.write(generated_api_documentation)
 
-    logging.info("Navigate to http://localhost:5000 for the API catalogue.")
+    logging.info(f"Navigate to http://localhost:5000{SWAGGER_URL} for the API catalogue.")
+    logging.info(f"Code for new endpoint saved to {NEW_ENDPOINT_FILEPATH}")
 
-    # Generate new endpoint based on user's request
-    new_endpoint_description = "I want to create a new endpoint which deletes user agents from all devices"
-    prompt = PROMPT_GENERATE_NEW_ENDPOINT.replace("<PATHS>", str(filepaths))
 
-    # Only consider half of the file contents, otherwise the OpenAPI token limit may be reached
-    file_contents_str = str(file_contents)
-    mid_index = len(file_contents_str) // 2
-    file_contents_first_half = file_contents_str[:mid_index]
+@app.get(SWAGGER_URL, response_class=HTMLResponse)
+async def swagger_ui() -> HTMLResponse:
+    return get_swagger_ui_html(openapi_url=API_URL, title="API catalogue")
 
-    prompt = prompt.replace("<FILE CONTENTS>", str(file_contents_first_half))
-    prompt = prompt.replace("<DESCRIPTION>", new_endpoint_description)
-    new_api_endpoint_code = generate_response(prompt, 10000)
-    logging.info(f"Code for new endpoint: {new_api_endpoint_code}")
+
+def load_swagger_file() -> tuple:
+    """
+    Returns the contents and the ETag of the Swagger documentation, reading the file only if it has changed.
+
+    Returns:
+        Tuple of the file contents (bytes) and its ETag (str).
+    """
+    mtime = os.stat(SWAGGER_FILE_FILEPATH).st_mtime_ns
+    if mtime != swagger_file_cache["mtime"]:
+        content = Path(SWAGGER_FILE_FILEPATH).read_bytes()
+        swagger_file_cache["content"] = content
+        swagger_file_cache["etag"] = f'"{hashlib.md5(content).hexdigest()}"'
+        swagger_file_cache["mtime"] = mtime
+    return swagger_file_cache["content"], swagger_file_cache["etag"]
 
 
-@app.route(API_URL)
-def swagger_yaml():
-    return send_file(SWAGGER_FILE_FILEPATH, mimetype="text/yaml")
+@app.get(API_URL)
+async def swagger_yaml(request: Request) -> Response:
+    content, etag = load_swagger_file()
+    headers = {"ETag": etag, "Cache-Control": "public, max-age=60"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content, media_type="text/yaml", headers=headers)
 
 
 if __name__ == "__main__":
-    main()
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    asyncio.run(main())
+    if os.getenv("CATALOGUE_DEBUG"):
+        uvicorn.run("main:app", host="0.0.0.0", port=5000, reload=True)
+    else:
+        uvicorn.run("main:app", host="0.0.0.0", port=5000, workers=4)
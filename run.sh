@@ -0,0 +1,3 @@
+#!/bin/sh
+# Serves the already generated API catalogue without regenerating the documentation
+exec gunicorn -w 4 -k uvicorn.workers.UvicornWorker -b 0.0.0.0:5000 main:app